@@ -3,7 +3,8 @@ from __future__ import annotations
 """FRANZ: Narrative-driven stateless Windows 11 desktop agent.
 
 Architecture:
-  - Model receives ONLY the current screenshot per step (no chat history, no hidden state).
+  - Model receives ONLY the current screenshot per step (no chat history, no hidden state):
+    a low-res full-screen overview plus a close-up of the FRANZ MEMORY text.
   - The cyan FRANZ MEMORY window contains the operation story—visible to the model in screenshots.
   - The story is the only persistence: the model reads where it is in the narrative, then writes the next chapter.
   - One tool call per step enforced via tool_choice=required.
@@ -11,8 +12,11 @@ Architecture:
   - Win32 APIs via ctypes; RichEdit for HUD; SendInput for actions.
   
 Image Processing:
-  - Lanczos3 downsampling with unsharp mask for text clarity at low resolutions.
-  - Custom PNG encoder (no external dependencies).
+  - GDI HALFTONE StretchBlt downsampling at capture time, NumPy unsharp mask for text clarity at low resolutions.
+  - Custom PNG encoder on top of zlib (no imaging library).
+
+Requirements:
+  - Python 3.10+ on Windows, NumPy (capture view and sharpening).
   
 Prompting & Sampling:
   - Story-aware dynamic sampling: exploratory (temp=1.8) when searching, deterministic (temp=0.8) when executing.
@@ -22,31 +26,44 @@ Prompting & Sampling:
 """
 
 import argparse
+import array
 import base64
+import concurrent.futures
 import ctypes
 import ctypes.wintypes as w
+import functools
+import http.client
 import json
-import math
 import struct
 import threading
 import time
-import urllib.request
+import urllib.parse
 import zlib
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+
 # ----------------------------- Configuration -----------------------------
 
 API_URL = "http://localhost:1234/v1/chat/completions"
 MODEL_NAME = "qwen3-vl-2b-instruct"
 
-SCREENSHOT_QUALITY = 2
+SCREENSHOT_QUALITY = 3
 SCREEN_W, SCREEN_H = {1: (1536, 864), 2: (1024, 576), 3: (512, 288)}[SCREENSHOT_QUALITY]
 
+PNG_COMPRESS_LEVEL = 1
+
 DUMP_FOLDER = Path("dump")
 HUD_FONT_HEIGHT = 20
+HUD_W, HUD_H = 600, 800
+# FRANZ MEMORY close-up, sent next to the low-res overview so the story stays legible. The 560x720 edit becomes
+# 336x432 (~145k px; overview 147k), and 20 px Consolas keeps ~12 px line height; much below that glyphs blur.
+MEMORY_CROP_SCALE = 0.6
+ACTION_SETTLE_MS = 150  # wait after the action (and the HUD repaint) before the next capture
 
 
 def get_sampling_config(story: str) -> dict[str, Any]:
@@ -60,8 +77,8 @@ def get_sampling_config(story: str) -> dict[str, Any]:
             "presence_penalty": 0.0,
             "frequency_penalty": 0.0,
             "repeat_penalty": 1.10,
-            "max_tokens": 600,
-            "min_completion_tokens": 150,
+            "max_tokens": 220,
+            "min_completion_tokens": 40,
         }
     return {
         "temperature": 0.8,
@@ -70,12 +87,12 @@ def get_sampling_config(story: str) -> dict[str, Any]:
         "presence_penalty": 0.0,
         "frequency_penalty": 0.0,
         "repeat_penalty": 1.20,
-        "max_tokens": 600,
-        "min_completion_tokens": 150,
+        "max_tokens": 220,
+        "min_completion_tokens": 40,
     }
 
 
-SYSTEM_PROMPT = """You are a character in a story. The cyan FRANZ MEMORY window contains the story so far. Read it. The screenshot shows the current scene. Your job: advance the story by one action. Write the next chapter in the report field."""
+SYSTEM_PROMPT = """You are a character in a story. The cyan FRANZ MEMORY window contains the story so far. Read it. The first image shows the current scene (coordinates 0-1000 on both axes refer to it); the second image, when present, is a close-up of the FRANZ MEMORY text. Your job: advance the story by one action. Write the next chapter in the report field (40-120 words: CHAPTER SUMMARY / CURRENT SCENE / NEXT ACTION)."""
 
 STORY_PREAMBLE = """FRANZ OPERATION LOG
 
@@ -98,144 +115,61 @@ STORY BEGINS:
 
 """
 
-TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "click",
-            "description": "Advance story: click coordinates.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "x": {"type": "number", "description": "X coordinate (0-1000)"},
-                    "y": {"type": "number", "description": "Y coordinate (0-1000)"},
-                    "report": {
-                        "type": "string",
-                        "description": "Story continuation (150-250 words). CHAPTER SUMMARY / CURRENT SCENE / NEXT ACTION.",
-                        "minLength": 150,
-                    },
-                },
-                "required": ["x", "y", "report"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "drag",
-            "description": "Advance story: drag from start to end.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "x1": {"type": "number", "description": "Start X (0-1000)"},
-                    "y1": {"type": "number", "description": "Start Y (0-1000)"},
-                    "x2": {"type": "number", "description": "End X (0-1000)"},
-                    "y2": {"type": "number", "description": "End Y (0-1000)"},
-                    "report": {"type": "string", "description": "Story continuation.", "minLength": 150},
-                },
-                "required": ["x1", "y1", "x2", "y2", "report"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "type",
-            "description": "Advance story: type text.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {"type": "string", "description": "Text to type"},
-                    "report": {"type": "string", "minLength": 150},
-                },
-                "required": ["text", "report"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "double_click",
-            "description": "Advance story: double-click coordinates.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "x": {"type": "number"},
-                    "y": {"type": "number"},
-                    "report": {"type": "string", "minLength": 150},
-                },
-                "required": ["x", "y", "report"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "right_click",
-            "description": "Advance story: right-click for context menu.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "x": {"type": "number"},
-                    "y": {"type": "number"},
-                    "report": {"type": "string", "minLength": 150},
-                },
-                "required": ["x", "y", "report"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "scroll",
-            "description": "Advance story: scroll to reveal content.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "dy": {"type": "number", "description": "Scroll amount (positive=up, negative=down)"},
-                    "report": {"type": "string", "minLength": 150},
-                },
-                "required": ["dy", "report"],
-            },
-        },
-    },
-    {
+_COORD = {"type": "number"}
+_REPORT = {"type": "string", "minLength": 40}
+
+
+def _tool(name: str, description: str, **params: dict[str, Any]) -> dict[str, Any]:
+    return {
         "type": "function",
         "function": {
-            "name": "observe",
-            "description": "Advance story: document findings without action.",
+            "name": name,
+            "description": description,
             "parameters": {
                 "type": "object",
-                "properties": {
-                    "report": {
-                        "type": "string",
-                        "description": "Story continuation: what you see, why no action is taken yet.",
-                        "minLength": 150,
-                    }
-                },
-                "required": ["report"],
+                "properties": {**params, "report": _REPORT},
+                "required": [*params, "report"],
             },
         },
-    },
+    }
+
+
+TOOLS = [
+    _tool("click", "Advance story: click.", x=_COORD, y=_COORD),
+    _tool("drag", "Advance story: drag start to end.", x1=_COORD, y1=_COORD, x2=_COORD, y2=_COORD),
+    _tool("type", "Advance story: type text.", text={"type": "string"}),
+    _tool("double_click", "Advance story: double-click.", x=_COORD, y=_COORD),
+    _tool("right_click", "Advance story: open context menu.", x=_COORD, y=_COORD),
+    _tool("scroll", "Advance story: scroll (+up, -down).", dy={"type": "number"}),
+    _tool("observe", "Advance story: no action yet."),
 ]
 
+TOOL_REQUIRED = {t["function"]["name"]: set(t["function"]["parameters"]["required"]) for t in TOOLS}
+
 # ----------------------------- Win32 setup -----------------------------
 
 user32 = ctypes.WinDLL("user32", use_last_error=True)
 gdi32 = ctypes.WinDLL("gdi32", use_last_error=True)
 kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
 comctl32 = ctypes.WinDLL("comctl32", use_last_error=True)
+synch = ctypes.WinDLL("API-MS-Win-Core-Synch-l1-2-0", use_last_error=True)  # WaitOnAddress, Windows 8+
 
 try:
     ctypes.WinDLL("Shcore").SetProcessDpiAwareness(2)
 except Exception:
     pass
 
+kernel32.LoadLibraryW.argtypes = [w.LPCWSTR]
+kernel32.LoadLibraryW.restype = w.HMODULE
+
 try:
     kernel32.LoadLibraryW("Msftedit.dll")
 except Exception:
     pass
 
+SM_CXSCREEN = 0
+SM_CYSCREEN = 1
+
 INPUT_MOUSE = 0
 INPUT_KEYBOARD = 1
 WHEEL_DELTA = 120
@@ -257,6 +191,7 @@ WS_SYSMENU = 0x00080000
 WS_THICKFRAME = 0x00040000
 WS_MINIMIZEBOX = 0x00020000
 WS_VISIBLE = 0x10000000
+WS_CLIPCHILDREN = 0x02000000
 WS_VSCROLL = 0x00200000
 WS_CHILD = 0x40000000
 
@@ -266,16 +201,34 @@ ES_READONLY = 0x0800
 
 WS_EX_TOPMOST = 0x00000008
 WS_EX_LAYERED = 0x00080000
+GWL_EXSTYLE = -20
+GW_HWNDPREV = 3
+Z_ORDER_SCAN_LIMIT = 64
 
 BS_PUSHBUTTON = 0x00000000
 
 WM_SETFONT = 0x0030
 WM_CLOSE = 0x0010
 WM_DESTROY = 0x0002
+WM_NCDESTROY = 0x0082
 WM_COMMAND = 0x0111
+WM_QUIT = 0x0012
+
+PM_REMOVE = 0x0001
+QS_ALLINPUT = 0x04FF
+MWMO_INPUTAVAILABLE = 0x0004
+INFINITE = 0xFFFFFFFF
+WAIT_OBJECT_0 = 0x00000000
+WAIT_FAILED = 0xFFFFFFFF
+MSG_DRAIN_LIMIT = 64
+
+ES_CONTINUOUS = 0x80000000
+ES_DISPLAY_REQUIRED = 0x00000002
 
 EM_SETBKGNDCOLOR = 0x0443
 EM_SETREADONLY = 0x00CF
+EM_SETSEL = 0x00B1
+EM_REPLACESEL = 0x00C2
 
 SW_SHOWNOACTIVATE = 4
 SWP_NOMOVE = 0x0002
@@ -285,6 +238,7 @@ SWP_SHOWWINDOW = 0x0040
 
 HWND_TOPMOST = -1
 SRCCOPY = 0x00CC0020
+HALFTONE = 4
 LWA_ALPHA = 0x00000002
 
 CS_HREDRAW = 0x0002
@@ -412,12 +366,16 @@ user32.SendMessageW.argtypes = [w.HWND, ctypes.c_uint, w.WPARAM, w.LPARAM]
 user32.SendMessageW.restype = w.LPARAM
 user32.PostMessageW.argtypes = [w.HWND, ctypes.c_uint, w.WPARAM, w.LPARAM]
 user32.PostMessageW.restype = w.BOOL
-user32.GetMessageW.argtypes = [ctypes.POINTER(MSG), w.HWND, ctypes.c_uint, ctypes.c_uint]
-user32.GetMessageW.restype = w.BOOL
 user32.TranslateMessage.argtypes = [ctypes.POINTER(MSG)]
 user32.TranslateMessage.restype = w.BOOL
 user32.DispatchMessageW.argtypes = [ctypes.POINTER(MSG)]
 user32.DispatchMessageW.restype = w.LPARAM
+user32.PeekMessageW.argtypes = [ctypes.POINTER(MSG), w.HWND, ctypes.c_uint, ctypes.c_uint, ctypes.c_uint]
+user32.PeekMessageW.restype = w.BOOL
+user32.MsgWaitForMultipleObjectsEx.argtypes = [w.DWORD, ctypes.POINTER(w.HANDLE), w.DWORD, w.DWORD, w.DWORD]
+user32.MsgWaitForMultipleObjectsEx.restype = w.DWORD
+user32.IsWindow.argtypes = [w.HWND]
+user32.IsWindow.restype = w.BOOL
 user32.SetLayeredWindowAttributes.argtypes = [w.HWND, w.COLORREF, ctypes.c_ubyte, w.DWORD]
 user32.SetLayeredWindowAttributes.restype = w.BOOL
 user32.DefWindowProcW.argtypes = [w.HWND, ctypes.c_uint, w.WPARAM, w.LPARAM]
@@ -426,6 +384,16 @@ user32.RegisterClassExW.argtypes = [ctypes.POINTER(WNDCLASSEXW)]
 user32.RegisterClassExW.restype = w.ATOM
 user32.LoadCursorW.argtypes = [w.HINSTANCE, w.LPCWSTR]
 user32.LoadCursorW.restype = HCURSOR
+user32.GetWindowRect.argtypes = [w.HWND, ctypes.POINTER(w.RECT)]
+user32.GetWindowRect.restype = w.BOOL
+user32.IsIconic.argtypes = [w.HWND]
+user32.IsIconic.restype = w.BOOL
+user32.GetWindowLongW.argtypes = [w.HWND, ctypes.c_int]
+user32.GetWindowLongW.restype = w.LONG
+user32.GetWindow.argtypes = [w.HWND, ctypes.c_uint]
+user32.GetWindow.restype = w.HWND
+user32.IsWindowVisible.argtypes = [w.HWND]
+user32.IsWindowVisible.restype = w.BOOL
 
 gdi32.CreateCompatibleDC.argtypes = [w.HDC]
 gdi32.CreateCompatibleDC.restype = w.HDC
@@ -433,8 +401,17 @@ gdi32.CreateDIBSection.argtypes = [w.HDC, ctypes.POINTER(BITMAPINFO), ctypes.c_u
 gdi32.CreateDIBSection.restype = w.HBITMAP
 gdi32.SelectObject.argtypes = [w.HDC, w.HGDIOBJ]
 gdi32.SelectObject.restype = w.HGDIOBJ
-gdi32.BitBlt.argtypes = [w.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, w.HDC, ctypes.c_int, ctypes.c_int, w.DWORD]
-gdi32.BitBlt.restype = w.BOOL
+gdi32.StretchBlt.argtypes = [
+    w.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+    w.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, w.DWORD,
+]
+gdi32.StretchBlt.restype = w.BOOL
+gdi32.SetStretchBltMode.argtypes = [w.HDC, ctypes.c_int]
+gdi32.SetStretchBltMode.restype = ctypes.c_int
+gdi32.SetBrushOrgEx.argtypes = [w.HDC, ctypes.c_int, ctypes.c_int, ctypes.POINTER(w.POINT)]
+gdi32.SetBrushOrgEx.restype = w.BOOL
+gdi32.GdiFlush.argtypes = []
+gdi32.GdiFlush.restype = w.BOOL
 gdi32.DeleteDC.argtypes = [w.HDC]
 gdi32.DeleteDC.restype = w.BOOL
 gdi32.CreateFontW.argtypes = [
@@ -445,6 +422,18 @@ gdi32.CreateFontW.restype = w.HFONT
 
 kernel32.GetModuleHandleW.argtypes = [w.LPCWSTR]
 kernel32.GetModuleHandleW.restype = w.HMODULE
+kernel32.CreateEventW.argtypes = [w.LPVOID, w.BOOL, w.BOOL, w.LPCWSTR]
+kernel32.CreateEventW.restype = w.HANDLE
+kernel32.SetEvent.argtypes = [w.HANDLE]
+kernel32.SetEvent.restype = w.BOOL
+kernel32.CloseHandle.argtypes = [w.HANDLE]
+kernel32.CloseHandle.restype = w.BOOL
+kernel32.SetThreadExecutionState.argtypes = [w.DWORD]
+kernel32.SetThreadExecutionState.restype = w.DWORD
+synch.WaitOnAddress.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, w.DWORD]
+synch.WaitOnAddress.restype = w.BOOL
+synch.WakeByAddressAll.argtypes = [ctypes.c_void_p]
+synch.WakeByAddressAll.restype = None
 
 # ----------------------------- Helpers -----------------------------
 
@@ -454,275 +443,365 @@ class Coord:
     sw: int
     sh: int
 
+    _sx: float = field(init=False)
+    _sy: float = field(init=False)
+    _kx: float = field(init=False)
+    _ky: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._sx = self.sw / 1000
+        self._sy = self.sh / 1000
+        self._kx = 65535 / self.sw if self.sw > 0 else 0.0
+        self._ky = 65535 / self.sh if self.sh > 0 else 0.0
+
     def to_screen(self, x: float, y: float) -> tuple[int, int]:
         return (
-            int(max(0.0, min(1000.0, x)) * self.sw / 1000),
-            int(max(0.0, min(1000.0, y)) * self.sh / 1000),
+            int(min(1000.0, max(0.0, x)) * self._sx),
+            int(min(1000.0, max(0.0, y)) * self._sy),
         )
 
     def to_win32(self, x: int, y: int) -> tuple[int, int]:
-        return (
-            int(x * 65535 / self.sw) if self.sw > 0 else 0,
-            int(y * 65535 / self.sh) if self.sh > 0 else 0,
-        )
+        return int(x * self._kx), int(y * self._ky)
+
 
+# Read once after the DPI-awareness call above, so these are physical pixels.
+SW, SH = user32.GetSystemMetrics(SM_CXSCREEN), user32.GetSystemMetrics(SM_CYSCREEN)
+DEFAULT_COORD = Coord(sw=SW, sh=SH)
 
-def send_input(inputs: list[INPUT]) -> None:
-    arr = (INPUT * len(inputs))(*inputs)
-    sent = user32.SendInput(len(inputs), arr, ctypes.sizeof(INPUT))
-    if sent != len(inputs):
+
+INPUT_POOL_SIZE = 4096
+_INPUT_POOL = (INPUT * INPUT_POOL_SIZE)()  # filled in place; only the agent loop sends input
+
+
+def send_input(count: int, settle: float = 0.0) -> None:
+    """Send the first `count` entries of the shared INPUT pool, then sleep `settle` seconds."""
+    sent = user32.SendInput(count, _INPUT_POOL, ctypes.sizeof(INPUT))
+    if sent != count:
         raise ctypes.WinError(ctypes.get_last_error())
-    time.sleep(0.05)
+    if settle:
+        time.sleep(settle)
 
 
-def make_mouse_input(dx: int, dy: int, flags: int, data: int = 0) -> INPUT:
-    inp = INPUT()
+def set_mouse_input(i: int, dx: int, dy: int, flags: int, data: int = 0) -> None:
+    inp = _INPUT_POOL[i]
     inp.type = INPUT_MOUSE
-    inp.union.mi = MOUSEINPUT(dx=dx, dy=dy, mouseData=data, dwFlags=flags, time=0, dwExtraInfo=None)
-    return inp
+    mi = inp.union.mi
+    mi.dx = dx
+    mi.dy = dy
+    mi.mouseData = data
+    mi.dwFlags = flags
+    mi.time = 0
+    mi.dwExtraInfo = None
+
+
+def set_key_input(i: int, code: int, flags: int) -> None:
+    inp = _INPUT_POOL[i]
+    inp.type = INPUT_KEYBOARD
+    ki = inp.union.ki
+    ki.wVk = 0
+    ki.wScan = code
+    ki.dwFlags = flags
+    ki.time = 0
+    ki.dwExtraInfo = None
 
 
 def mouse_click(x: int, y: int, conv: Coord) -> None:
     ax, ay = conv.to_win32(x, y)
-    send_input([
-        make_mouse_input(ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE),
-        make_mouse_input(0, 0, MOUSEEVENTF_LEFTDOWN),
-        make_mouse_input(0, 0, MOUSEEVENTF_LEFTUP),
-    ])
+    set_mouse_input(0, ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+    set_mouse_input(1, 0, 0, MOUSEEVENTF_LEFTDOWN)
+    set_mouse_input(2, 0, 0, MOUSEEVENTF_LEFTUP)
+    send_input(3, settle=0.05)
 
 
 def mouse_right_click(x: int, y: int, conv: Coord) -> None:
     ax, ay = conv.to_win32(x, y)
-    send_input([
-        make_mouse_input(ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE),
-        make_mouse_input(0, 0, MOUSEEVENTF_RIGHTDOWN),
-        make_mouse_input(0, 0, MOUSEEVENTF_RIGHTUP),
-    ])
+    set_mouse_input(0, ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+    set_mouse_input(1, 0, 0, MOUSEEVENTF_RIGHTDOWN)
+    set_mouse_input(2, 0, 0, MOUSEEVENTF_RIGHTUP)
+    send_input(3, settle=0.05)
 
 
 def mouse_double_click(x: int, y: int, conv: Coord) -> None:
     ax, ay = conv.to_win32(x, y)
-    click_down = make_mouse_input(0, 0, MOUSEEVENTF_LEFTDOWN)
-    click_up = make_mouse_input(0, 0, MOUSEEVENTF_LEFTUP)
-    send_input([make_mouse_input(ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE), click_down, click_up])
+    set_mouse_input(0, ax, ay, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+    set_mouse_input(1, 0, 0, MOUSEEVENTF_LEFTDOWN)
+    set_mouse_input(2, 0, 0, MOUSEEVENTF_LEFTUP)
+    send_input(3)
     time.sleep(0.05)
-    send_input([click_down, click_up])
+    set_mouse_input(0, 0, 0, MOUSEEVENTF_LEFTDOWN)
+    set_mouse_input(1, 0, 0, MOUSEEVENTF_LEFTUP)
+    send_input(2, settle=0.05)
 
 
 def mouse_drag(x1: int, y1: int, x2: int, y2: int, conv: Coord) -> None:
     ax1, ay1 = conv.to_win32(x1, y1)
     ax2, ay2 = conv.to_win32(x2, y2)
 
-    send_input([
-        make_mouse_input(ax1, ay1, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE),
-        make_mouse_input(0, 0, MOUSEEVENTF_LEFTDOWN),
-    ])
+    set_mouse_input(0, ax1, ay1, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+    set_mouse_input(1, 0, 0, MOUSEEVENTF_LEFTDOWN)
+    send_input(2)
     time.sleep(0.05)
 
     steps = 10
-    for i in range(1, steps + 1):
-        t = i / steps
+    for i in range(steps):
+        t = (i + 1) / steps
         ix = int(ax1 + (ax2 - ax1) * t)
         iy = int(ay1 + (ay2 - ay1) * t)
-        send_input([make_mouse_input(ix, iy, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)])
-        time.sleep(0.01)
+        set_mouse_input(i, ix, iy, MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+    send_input(steps, settle=0.05)  # let the target see the pointer arrive before the button comes up
 
-    send_input([make_mouse_input(0, 0, MOUSEEVENTF_LEFTUP)])
+    set_mouse_input(0, 0, 0, MOUSEEVENTF_LEFTUP)
+    send_input(1)
 
 
 def type_text(text: str) -> None:
     if not text:
         return
 
-    inputs: list[INPUT] = []
-    utf16_bytes = text.encode("utf-16le")
-
-    for i in range(0, len(utf16_bytes), 2):
-        code = utf16_bytes[i] | (utf16_bytes[i + 1] << 8)
+    codes = array.array("H", text.encode("utf-16le"))  # native order is little-endian on Windows
 
-        inp_down = INPUT()
-        inp_down.type = INPUT_KEYBOARD
-        inp_down.union.ki = KEYBDINPUT(wVk=0, wScan=code, dwFlags=KEYEVENTF_UNICODE, time=0, dwExtraInfo=None)
-        inputs.append(inp_down)
+    n = 0
+    for code in codes:
+        if n == INPUT_POOL_SIZE:
+            send_input(n)
+            n = 0
+        set_key_input(n, code, KEYEVENTF_UNICODE)
+        set_key_input(n + 1, code, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)
+        n += 2
 
-        inp_up = INPUT()
-        inp_up.type = INPUT_KEYBOARD
-        inp_up.union.ki = KEYBDINPUT(wVk=0, wScan=code, dwFlags=KEYEVENTF_UNICODE | KEYEVENTF_KEYUP, time=0, dwExtraInfo=None)
-        inputs.append(inp_up)
-
-    if inputs:
-        send_input(inputs)
+    if n:
+        send_input(n)
 
 
 def scroll(dy: float) -> None:
-    ticks = max(1, int(abs(dy) / WHEEL_DELTA))
+    ticks = min(INPUT_POOL_SIZE, max(1, int(abs(dy) / WHEEL_DELTA)))
     direction = 1 if dy > 0 else -1
-    send_input([make_mouse_input(0, 0, MOUSEEVENTF_WHEEL, WHEEL_DELTA * direction) for _ in range(ticks)])
-
-
-def capture_screen(sw: int, sh: int) -> bytes:
-    sdc = user32.GetDC(0)
-    if not sdc:
-        raise ctypes.WinError(ctypes.get_last_error())
-
-    mdc = gdi32.CreateCompatibleDC(sdc)
-    if not mdc:
-        user32.ReleaseDC(0, sdc)
-        raise ctypes.WinError(ctypes.get_last_error())
-
-    bmi = BITMAPINFO()
-    bmi.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
-    bmi.bmiHeader.biWidth = sw
-    bmi.bmiHeader.biHeight = -sh
-    bmi.bmiHeader.biPlanes = 1
-    bmi.bmiHeader.biBitCount = 32
-
-    bits = ctypes.c_void_p()
-    hbm = gdi32.CreateDIBSection(sdc, ctypes.byref(bmi), 0, ctypes.byref(bits), None, 0)
-    if not hbm:
-        gdi32.DeleteDC(mdc)
-        user32.ReleaseDC(0, sdc)
-        raise ctypes.WinError(ctypes.get_last_error())
-
-    gdi32.SelectObject(mdc, hbm)
-
-    if not gdi32.BitBlt(mdc, 0, 0, sw, sh, sdc, 0, 0, SRCCOPY):
-        gdi32.DeleteObject(hbm)
-        gdi32.DeleteDC(mdc)
-        user32.ReleaseDC(0, sdc)
-        raise ctypes.WinError(ctypes.get_last_error())
-
-    out = ctypes.string_at(bits, sw * sh * 4)
-
-    user32.ReleaseDC(0, sdc)
-    gdi32.DeleteDC(mdc)
-    gdi32.DeleteObject(hbm)
-
-    return out
+    for i in range(ticks):
+        set_mouse_input(i, 0, 0, MOUSEEVENTF_WHEEL, WHEEL_DELTA * direction)
+    send_input(ticks)
 
 
-def downsample(src: bytes, sw: int, sh: int, dw: int, dh: int) -> bytes:
-    """Lanczos3 downsampling with unsharp mask for text clarity."""
-    if (sw, sh) == (dw, dh):
-        return src
-
-    def lanczos_kernel(x: float, a: int = 3) -> float:
-        if x == 0.0:
-            return 1.0
-        if abs(x) >= a:
-            return 0.0
-        pi_x = math.pi * x
-        return a * math.sin(pi_x) * math.sin(pi_x / a) / (pi_x * pi_x)
-
-    src_mv = memoryview(src)
-    temp = bytearray(dw * dh * 4)
-
-    x_scale = sw / dw
-    y_scale = sh / dh
-    radius = 3
-
-    for dy in range(dh):
-        cy = (dy + 0.5) * y_scale - 0.5
-        y_start = max(0, int(cy - radius))
-        y_end = min(sh, int(cy + radius) + 1)
+@dataclass(slots=True)
+class Screenshotter:
+    """Long-lived screen DC, memory DC and dw x dh DIB section, reused across frames."""
 
-        for dx in range(dw):
-            cx = (dx + 0.5) * x_scale - 0.5
-            x_start = max(0, int(cx - radius))
-            x_end = min(sw, int(cx + radius) + 1)
+    dw: int
+    dh: int
 
-            accum = [0.0, 0.0, 0.0, 0.0]
-            weight_sum = 0.0
+    sdc: w.HDC | None = None
+    mdc: w.HDC | None = None
+    hbm: w.HBITMAP | None = None
+    pixels: np.ndarray | None = None
 
-            for sy in range(y_start, y_end):
-                wy = lanczos_kernel((sy - cy) / y_scale)
-                for sx in range(x_start, x_end):
-                    wx = lanczos_kernel((sx - cx) / x_scale)
-                    w = wx * wy
+    def __post_init__(self) -> None:
+        self.sdc = user32.GetDC(0)
+        if not self.sdc:
+            raise ctypes.WinError(ctypes.get_last_error())
 
-                    si = (sy * sw + sx) * 4
-                    for c in range(4):
-                        accum[c] += src_mv[si + c] * w
-                    weight_sum += w
+        self.mdc = gdi32.CreateCompatibleDC(self.sdc)
+        if not self.mdc:
+            err = ctypes.get_last_error()
+            self.close()
+            raise ctypes.WinError(err)
+
+        bmi = BITMAPINFO()
+        bmi.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        bmi.bmiHeader.biWidth = self.dw
+        bmi.bmiHeader.biHeight = -self.dh
+        bmi.bmiHeader.biPlanes = 1
+        bmi.bmiHeader.biBitCount = 32
+
+        bits = ctypes.c_void_p()
+        self.hbm = gdi32.CreateDIBSection(self.sdc, ctypes.byref(bmi), 0, ctypes.byref(bits), None, 0)
+        if not self.hbm:
+            err = ctypes.get_last_error()
+            self.close()
+            raise ctypes.WinError(err)
+
+        gdi32.SelectObject(self.mdc, self.hbm)
+        gdi32.SetStretchBltMode(self.mdc, HALFTONE)
+        gdi32.SetBrushOrgEx(self.mdc, 0, 0, None)
+
+        # BitBlt writes straight into the DIB section's user-space memory; view it without copying.
+        buf = (ctypes.c_ubyte * (self.dw * self.dh * 4)).from_address(bits.value)
+        self.pixels = np.frombuffer(buf, dtype=np.uint8).reshape(self.dh, self.dw, 4)
+
+    def capture(self, sx: int, sy: int, sw: int, sh: int) -> np.ndarray:
+        """Capture the sw x sh screen region at (sx, sy), HALFTONE-scaled to dw x dh.
+
+        Returns a BGRA view of the DIB section, overwritten by the next capture.
+        """
+        if not gdi32.StretchBlt(self.mdc, 0, 0, self.dw, self.dh, self.sdc, sx, sy, sw, sh, SRCCOPY):
+            raise ctypes.WinError(ctypes.get_last_error())
+        gdi32.GdiFlush()
+        return self.pixels
+
+    def close(self) -> None:
+        self.pixels = None
+        if self.mdc:
+            gdi32.DeleteDC(self.mdc)
+            self.mdc = None
+        if self.hbm:
+            gdi32.DeleteObject(self.hbm)
+            self.hbm = None
+        if self.sdc:
+            user32.ReleaseDC(0, self.sdc)
+            self.sdc = None
 
-            di = (dy * dw + dx) * 4
-            if weight_sum > 0.0:
-                for c in range(4):
-                    val = int(accum[c] / weight_sum)
-                    temp[di + c] = max(0, min(255, val))
 
-    dst = bytearray(dw * dh * 4)
+@dataclass(slots=True)
+class SharpenBuffers:
+    """Scratch arrays for sharpen at one dw x dh size, reused across frames."""
+
+    dw: int
+    dh: int
+    padded: np.ndarray = field(init=False)
+    rows: np.ndarray = field(init=False)
+    blur: np.ndarray = field(init=False)
+    mask: np.ndarray = field(init=False)
+    scanlines: np.ndarray = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.padded = np.empty((self.dh + 2, self.dw + 2, 3), dtype=np.float32)
+        self.rows = np.empty((self.dh + 2, self.dw, 3), dtype=np.float32)
+        self.blur = np.empty((self.dh, self.dw, 3), dtype=np.float32)
+        self.mask = np.empty((self.dh, self.dw, 3), dtype=bool)
+        self.scanlines = np.zeros((self.dh, self.dw * 3 + 1), dtype=np.uint8)  # column 0: filter type None
+
+
+def sharpen(bgra: np.ndarray, buf: SharpenBuffers | None = None) -> np.ndarray:
+    """Unsharp mask for text clarity, written straight into PNG scanlines (filter byte + RGB).
+
+    With buf, nothing is allocated and the result is buf.scanlines, overwritten by the next call.
+    """
     amount = 0.8
     threshold = 10
 
-    for dy in range(dh):
-        for dx in range(dw):
-            di = (dy * dw + dx) * 4
-
-            blur = [0.0, 0.0, 0.0]
-            count = 0.0
-
-            for oy in range(-1, 2):
-                for ox in range(-1, 2):
-                    ny = max(0, min(dh - 1, dy + oy))
-                    nx = max(0, min(dw - 1, dx + ox))
-                    ni = (ny * dw + nx) * 4
-
-                    kernel_weight = 1.0 if (ox == 0 and oy == 0) else 0.5
-                    for c in range(3):
-                        blur[c] += temp[ni + c] * kernel_weight
-                    count += kernel_weight
-
-            for c in range(3):
-                blur[c] /= count
-
-            for c in range(3):
-                original = temp[di + c]
-                detail = original - blur[c]
-
-                if abs(detail) > threshold:
-                    sharpened = original + detail * amount
-                    dst[di + c] = max(0, min(255, int(sharpened)))
-                else:
-                    dst[di + c] = temp[di + c]
-
-            dst[di + 3] = temp[di + 3]
-
-    return bytes(dst)
+    dh, dw = bgra.shape[:2]
+    if buf is None:
+        buf = SharpenBuffers(dw=dw, dh=dh)
+
+    # Edge-padded float RGB; the interior doubles as the unblurred centre.
+    padded = buf.padded
+    center = padded[1:-1, 1:-1]
+    np.copyto(center, bgra[..., 2::-1])
+    padded[0, 1:-1] = center[0]
+    padded[-1, 1:-1] = center[-1]
+    padded[:, 0] = padded[:, 1]
+    padded[:, -1] = padded[:, -2]
+
+    # (center + 0.5 * neighbours) / 5 == (box3x3 + center) / 10, box sum as two 3-tap passes.
+    rows = np.add(padded[:, :-2], padded[:, 1:-1], out=buf.rows)
+    rows += padded[:, 2:]
+    blur = np.add(rows[:-2], rows[1:-1], out=buf.blur)
+    blur += rows[2:]
+    blur += center
+    blur /= 10.0
+
+    detail = np.subtract(center, blur, out=blur)
+    mask = np.greater(np.abs(detail, out=rows[:-2]), threshold, out=buf.mask)
+    detail *= amount
+    detail += center
+    np.clip(detail, 0, 255, out=detail)
+    np.copyto(center, detail, where=mask)
+
+    rgb = buf.scanlines[:, 1:].reshape(dh, dw, 3)
+    np.copyto(rgb, center, casting="unsafe")
+    return buf.scanlines
+
+
+def encode_png(scanlines: np.ndarray, width: int, height: int, compress_level: int = PNG_COMPRESS_LEVEL) -> bytes:
+    """Wrap (height, width*3 + 1) filter-byte-prefixed RGB scanlines in a PNG container.
+
+    Rows arrive with filter type None (sharpen writes them), so there is no per-row filter pass here.
+    """
+    # Default strategy, not Z_RLE: with filter None a flat colour repeats at distance 3 (one pixel), which RLE cannot match.
+    deflate = zlib.compressobj(compress_level, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY)
+    comp = deflate.compress(scanlines) + deflate.flush()
+    ihdr = struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0)
 
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(data, zlib.crc32(tag))
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc & 0xFFFFFFFF)
 
-def encode_png(bgra: bytes, width: int, height: int) -> bytes:
-    raw = bytearray((width * 3 + 1) * height)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", comp) + chunk(b"IEND", b"")
 
-    for y in range(height):
-        raw[y * (width * 3 + 1)] = 0
-        row_offset = y * width * 4
-        row = bgra[row_offset : row_offset + width * 4]
-        di = y * (width * 3 + 1) + 1
 
-        for x in range(width):
-            raw[di + x * 3] = row[x * 4 + 2]
-            raw[di + x * 3 + 1] = row[x * 4 + 1]
-            raw[di + x * 3 + 2] = row[x * 4]
+_API = urllib.parse.urlsplit(API_URL)
+_CONN = http.client.HTTPConnection(_API.hostname, _API.port, timeout=120)
+_IMG_SLOT = "__FRANZ_IMAGE__"
+STREAM_TAIL_EVENTS = 4  # events read after the tool call completes: finish_reason + usage + slack
+
+
+def read_tool_call_stream(lines: Iterable[bytes]) -> tuple[str, dict[str, Any]]:
+    """Accumulate the first streamed tool call and return it once its arguments parse with all required keys.
+
+    Generation has normally ended by then, so up to STREAM_TAIL_EVENTS trailing events (finish_reason, usage,
+    [DONE]) are read to EOF and the keep-alive connection stays reusable. Only a model still emitting past
+    that is abandoned mid-stream, which makes call_vlm drop the connection.
+    """
+    name = ""
+    args_buf = ""
+    result: tuple[str, dict[str, Any]] | None = None
+    tail = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            continue  # the chunked terminator follows; reading it closes the response cleanly
+
+        if result is not None:
+            tail += 1
+            if tail > STREAM_TAIL_EVENTS:
+                return result
+            continue
+
+        event = json.loads(data)
+        if "error" in event:
+            raise ValueError(f"VLM stream error: {event['error']}")
+        choices = event.get("choices") or []
+        if not choices:
+            continue  # e.g. the trailing usage chunk
+        choice = choices[0]
+        for tc in choice.get("delta", {}).get("tool_calls") or []:
+            if tc.get("index", 0) != 0:
+                continue
+            fn = tc.get("function", {})
+            name += fn.get("name") or ""
+            args_raw = fn.get("arguments")
+            if isinstance(args_raw, dict):
+                result = name, args_raw
+                break
+            args_buf += args_raw or ""
 
-    comp = zlib.compress(bytes(raw), 6)
-    ihdr = struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0)
+        if result is None and args_buf.rstrip().endswith("}"):
+            try:
+                args = json.loads(args_buf)
+            except json.JSONDecodeError:
+                pass
+            else:
+                if TOOL_REQUIRED.get(name, set()) <= args.keys():
+                    result = name, args
 
-    def chunk(tag: bytes, data: bytes) -> bytes:
-        return (
-            struct.pack(">I", len(data))
-            + tag
-            + data
-            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
-        )
+        if result is None and choice.get("finish_reason") == "length":
+            raise ValueError("VLM stream truncated (max_tokens)")
 
-    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", comp) + chunk(b"IEND", b"")
+    if result is not None:
+        return result
+    if not name:
+        raise ValueError("VLM stream ended without a tool call")
+    try:
+        return name, json.loads(args_buf or "{}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"VLM tool arguments are not valid JSON: {e}") from e
 
 
-def call_vlm(png: bytes, current_story: str) -> tuple[str, dict[str, Any]]:
-    """Call VLM with story-aware sampling parameters."""
-    sampling = get_sampling_config(current_story)
-    
+@functools.lru_cache(maxsize=8)
+def _request_template(n_images: int, sampling: tuple[tuple[str, Any], ...]) -> tuple[bytes, ...]:
+    """Serialized request body, split at each image's base64 slot (n_images + 1 parts)."""
     payload = {
         "model": MODEL_NAME,
         "messages": [
@@ -730,36 +809,52 @@ def call_vlm(png: bytes, current_story: str) -> tuple[str, dict[str, Any]]:
             {
                 "role": "user",
                 "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{base64.b64encode(png).decode('ascii')}"},
-                    }
+                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{_IMG_SLOT}"}}
+                    for _ in range(n_images)
                 ],
             },
         ],
         "tools": TOOLS,
         "tool_choice": "required",
-        **sampling,
+        "stream": True,
+        **dict(sampling),
     }
+    return tuple(json.dumps(payload).encode("utf-8").split(_IMG_SLOT.encode("ascii")))
 
-    req = urllib.request.Request(
-        API_URL,
-        json.dumps(payload).encode("utf-8"),
-        {"Content-Type": "application/json"},
-    )
 
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        data: dict[str, Any] = json.load(resp)
+def call_vlm(pngs: list[bytes], current_story: str) -> tuple[str, dict[str, Any]]:
+    """Call VLM with story-aware sampling parameters; pngs[0] is the full-screen overview."""
+    sampling = get_sampling_config(current_story)
+    head, *tails = _request_template(len(pngs), tuple(sampling.items()))
 
-    message = data["choices"][0]["message"]
-    tool_calls = message["tool_calls"]
-    tc = tool_calls[0]
+    # Only the base64 bytes are new per step; JSON never scans or escapes them.
+    parts = [head]
+    for png, tail in zip(pngs, tails, strict=True):
+        parts += (base64.b64encode(png), tail)
+    body = b"".join(parts)
+    headers = {"Content-Type": "application/json"}
 
-    name: str = tc["function"]["name"]
-    args_raw = tc["function"]["arguments"]
-    args: dict[str, Any] = json.loads(args_raw) if isinstance(args_raw, str) else args_raw
+    try:
+        try:
+            _CONN.request("POST", _API.path, body, headers)
+            resp = _CONN.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError):
+            _CONN.close()  # stale keep-alive socket: reconnect once
+            _CONN.request("POST", _API.path, body, headers)
+            resp = _CONN.getresponse()
+    except Exception:
+        # A half-sent request leaves the shared connection unusable (CannotSendRequest) until reset.
+        _CONN.close()
+        raise
 
-    return name, args
+    try:
+        if resp.status != 200:
+            raise http.client.HTTPException(f"HTTP {resp.status} {resp.reason}: {resp.read(500)!r}")
+        return read_tool_call_stream(resp)
+    finally:
+        if not resp.isclosed():
+            # Stopped mid-stream: dropping the connection also stops the server generating trailing tokens.
+            _CONN.close()
 
 
 # ----------------------------- HUD -----------------------------
@@ -776,13 +871,30 @@ class HUD:
     stop_event: threading.Event = field(default_factory=threading.Event)
 
     paused: bool = field(default=True)
-    pause_event: threading.Event = field(default_factory=threading.Event)
+    run_word: ctypes.c_uint32 = field(default_factory=ctypes.c_uint32)  # 0 while paused, 1 when running or stopping
 
     _wndproc_ref: Any = None
+    _stop_handle: w.HANDLE | None = None  # Win32 mirror of stop_event for the message-loop wait
+    _mono_font: w.HFONT | None = None
+    _ui_font: w.HFONT | None = None
+    _shown_story: str | None = None  # last text update() wrote; reset on pause/resume since the user may edit
     _BTN_ID = 1001
 
+    def _set_run_word(self, value: int) -> None:
+        # Aligned 32-bit store, then wake; WaitOnAddress re-compares before sleeping so no wake is lost.
+        self.run_word.value = value
+        if value:
+            synch.WakeByAddressAll(ctypes.byref(self.run_word))
+
+    def _signal_stop(self) -> None:
+        self.stop_event.set()
+        self._set_run_word(1)
+        if self._stop_handle:
+            kernel32.SetEvent(self._stop_handle)
+
     def _set_paused_ui(self, paused: bool) -> None:
         self.paused = paused
+        self._shown_story = None
 
         if self.button_hwnd:
             user32.SetWindowTextW(self.button_hwnd, "RESUME" if paused else "PAUSE")
@@ -790,10 +902,7 @@ class HUD:
         if self.edit_hwnd:
             user32.SendMessageW(self.edit_hwnd, EM_SETREADONLY, 0 if paused else 1, 0)
 
-        if paused:
-            self.pause_event.clear()
-        else:
-            self.pause_event.set()
+        self._set_run_word(0 if paused else 1)
 
     def _wndproc(self, hwnd: w.HWND, msg: int, wparam: w.WPARAM, lparam: w.LPARAM) -> w.LPARAM:
         try:
@@ -804,15 +913,21 @@ class HUD:
                     return 0
 
             elif msg == WM_CLOSE:
-                self.stop_event.set()
+                self._signal_stop()
                 user32.DestroyWindow(hwnd)
                 return 0
 
             elif msg == WM_DESTROY:
-                self.stop_event.set()
-                self.pause_event.set()
+                self._signal_stop()
                 return 0
 
+            elif msg == WM_NCDESTROY:
+                # Sent after the children are gone, so no control still has these fonts selected.
+                for font in (self._mono_font, self._ui_font):
+                    if font:
+                        gdi32.DeleteObject(font)
+                self._mono_font = self._ui_font = None
+
         except Exception as e:
             try:
                 print(f"[HUD wndproc error] {e}")
@@ -824,11 +939,8 @@ class HUD:
     def _window_thread(self) -> None:
         hinst = kernel32.GetModuleHandleW(None)
 
-        sw = user32.GetSystemMetrics(0)
-        sh = user32.GetSystemMetrics(1)
-
-        win_w, win_h = 600, 800
-        win_x, win_y = sw - win_w - 50, 50
+        win_w, win_h = HUD_W, HUD_H
+        win_x, win_y = SW - win_w - 50, 50
 
         self._wndproc_ref = WNDPROC(self._wndproc)
 
@@ -858,7 +970,9 @@ class HUD:
             WS_EX_TOPMOST | WS_EX_LAYERED,
             "FRANZWindowClass",
             "FRANZ MEMORY",
-            WS_OVERLAPPED | WS_CAPTION | WS_SYSMENU | WS_THICKFRAME | WS_MINIMIZEBOX | WS_VISIBLE,
+            # Created hidden: the children are built off-screen and the ShowWindow below paints once.
+            # WS_CLIPCHILDREN: the background erase skips the edit and button, which paint themselves.
+            WS_OVERLAPPED | WS_CAPTION | WS_SYSMENU | WS_THICKFRAME | WS_MINIMIZEBOX | WS_CLIPCHILDREN,
             win_x, win_y, win_w, win_h,
             None, None, hinst, None,
         )
@@ -867,10 +981,11 @@ class HUD:
             self.ready_event.set()
             return
 
-        user32.SetLayeredWindowAttributes(self.hwnd, 0, ctypes.c_ubyte(255), LWA_ALPHA)
+        user32.SetLayeredWindowAttributes(self.hwnd, 0, 255, LWA_ALPHA)
 
-        mono_font = gdi32.CreateFontW(-HUD_FONT_HEIGHT, 0, 0, 0, 400, 0, 0, 0, 1, 0, 0, 0, 0, "Consolas")
-        ui_font = gdi32.CreateFontW(-14, 0, 0, 0, 700, 0, 0, 0, 1, 0, 0, 0, 0, "Segoe UI")
+        # Owned by the HUD and released in WM_NCDESTROY; WM_SETFONT does not transfer ownership.
+        mono_font = self._mono_font = gdi32.CreateFontW(-HUD_FONT_HEIGHT, 0, 0, 0, 400, 0, 0, 0, 1, 0, 0, 0, 0, "Consolas")
+        ui_font = self._ui_font = gdi32.CreateFontW(-14, 0, 0, 0, 700, 0, 0, 0, 1, 0, 0, 0, 0, "Segoe UI")
 
         self.edit_hwnd = user32.CreateWindowExW(
             0, "RICHEDIT50W", "",
@@ -901,24 +1016,45 @@ class HUD:
         user32.ShowWindow(self.hwnd, SW_SHOWNOACTIVATE)
         user32.SetWindowPos(self.hwnd, HWND_TOPMOST, 0, 0, 0, 0, SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
 
+        # Keep the display on for the whole session; observe-only runs send no input to reset the idle timer.
+        # Execution state is per thread, so it is set and cleared here on the UI thread.
+        kernel32.SetThreadExecutionState(ES_CONTINUOUS | ES_DISPLAY_REQUIRED)
+
         self.ready_event.set()
 
         msg = MSG()
-        while not self.stop_event.is_set():
-            ret = user32.GetMessageW(ctypes.byref(msg), None, 0, 0)
-            if ret == 0 or ret == -1:
+        handles = (w.HANDLE * 1)(self._stop_handle)
+        # Hot loop: bind the calls and the MSG reference once rather than per message.
+        wait, peek = user32.MsgWaitForMultipleObjectsEx, user32.PeekMessageW
+        translate, dispatch = user32.TranslateMessage, user32.DispatchMessageW
+        stopped = self.stop_event.is_set
+        msg_ref = ctypes.byref(msg)
+        drain = range(MSG_DRAIN_LIMIT)
+        while not stopped():
+            ret = wait(1, handles, INFINITE, QS_ALLINPUT, MWMO_INPUTAVAILABLE)
+            if ret in (WAIT_OBJECT_0, WAIT_FAILED):
                 break
-            user32.TranslateMessage(ctypes.byref(msg))
-            user32.DispatchMessageW(ctypes.byref(msg))
 
-        self.stop_event.set()
-        self.pause_event.set()
+            for _ in drain:
+                if not peek(msg_ref, None, 0, 0, PM_REMOVE):
+                    break
+                if msg.message == WM_QUIT:
+                    self.stop_event.set()
+                    break
+                translate(msg_ref)
+                dispatch(msg_ref)
+
+        self._signal_stop()
+        if self.hwnd and user32.IsWindow(self.hwnd):
+            user32.DestroyWindow(self.hwnd)
+        kernel32.SetThreadExecutionState(ES_CONTINUOUS)
 
     def __enter__(self) -> "HUD":
         self.ready_event.clear()
         self.stop_event.clear()
-        self.pause_event.clear()
+        self._set_run_word(0)
         self.paused = True
+        self._stop_handle = kernel32.CreateEventW(None, True, False, None)
 
         self.thread = threading.Thread(target=self._window_thread, daemon=True)
         self.thread.start()
@@ -927,46 +1063,175 @@ class HUD:
         return self
 
     def __exit__(self, *_: Any) -> None:
-        self.stop_event.set()
-        self.pause_event.set()
-        if self.hwnd:
-            user32.PostMessageW(self.hwnd, WM_CLOSE, 0, 0)
+        # Wakes the message loop directly; the UI thread destroys its own window on the way out.
+        self._signal_stop()
         if self.thread:
             self.thread.join(timeout=1.0)
+        if self._stop_handle and not (self.thread and self.thread.is_alive()):
+            kernel32.CloseHandle(self._stop_handle)
+            self._stop_handle = None
 
     def update(self, story: str) -> None:
-        if self.edit_hwnd:
-            user32.SetWindowTextW(self.edit_hwnd, story)
-        if self.hwnd:
+        if self.edit_hwnd and story != self._shown_story:
+            self._shown_story = story
+            # Replace the whole selection in place rather than WM_SETTEXT, which rebuilds the text store.
+            buf = ctypes.create_unicode_buffer(story)
+            user32.SendMessageW(self.edit_hwnd, EM_SETSEL, 0, -1)
+            user32.SendMessageW(self.edit_hwnd, EM_REPLACESEL, 0, ctypes.addressof(buf))
+        if self.hwnd and self._topmost_lost():
             user32.SetWindowPos(self.hwnd, HWND_TOPMOST, 0, 0, 0, 0, SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
 
+    def _topmost_lost(self) -> bool:
+        """True when the HUD dropped out of the topmost band or another visible window overlaps it from above."""
+        if not user32.GetWindowLongW(self.hwnd, GWL_EXSTYLE) & WS_EX_TOPMOST:
+            return True
+        ours, other = w.RECT(), w.RECT()
+        if not user32.GetWindowRect(self.hwnd, ctypes.byref(ours)):
+            return False
+        above = user32.GetWindow(self.hwnd, GW_HWNDPREV)
+        for _ in range(Z_ORDER_SCAN_LIMIT):
+            if not above:
+                return False
+            if (
+                user32.IsWindowVisible(above)
+                and user32.GetWindowRect(above, ctypes.byref(other))
+                and other.left < ours.right and ours.left < other.right
+                and other.top < ours.bottom and ours.top < other.bottom
+            ):
+                return True
+            above = user32.GetWindow(above, GW_HWNDPREV)
+        return True
+
+    def memory_rect(self) -> tuple[int, int, int, int] | None:
+        """Screen rect (x, y, w, h) of the memory text, or None when it is not on screen."""
+        if not self.edit_hwnd or not self.hwnd or user32.IsIconic(self.hwnd):
+            return None
+        rect = w.RECT()
+        if not user32.GetWindowRect(self.edit_hwnd, ctypes.byref(rect)):
+            return None
+        width, height = rect.right - rect.left, rect.bottom - rect.top
+        if width <= 0 or height <= 0:
+            return None
+        return rect.left, rect.top, width, height
+
     def wait_for_resume(self) -> None:
-        while self.paused and not self.stop_event.is_set():
-            self.pause_event.wait(timeout=0.1)
+        """Block until RESUME or shutdown (both set run_word); wakes once a second only so Ctrl+C is seen."""
+        word = ctypes.byref(self.run_word)
+        paused = ctypes.c_uint32(0)
+        while self.run_word.value == 0:
+            synch.WaitOnAddress(word, ctypes.byref(paused), 4, 1000)
+
+
+# ----------------------------- Frame capture -----------------------------
+
+
+@dataclass(slots=True)
+class FrameGrabber:
+    """Captures and encodes frames on the caller's thread; dump files are written on a separate I/O thread."""
+
+    sw: int
+    sh: int
+    hud: HUD
+
+    _screen: Screenshotter | None = None
+    _memory: Screenshotter | None = None
+    _screen_buf: SharpenBuffers | None = None
+    _memory_buf: SharpenBuffers | None = None
+    _io: concurrent.futures.ThreadPoolExecutor | None = None
+
+    @staticmethod
+    def _write_dump(dump_path: Path, pngs: list[bytes]) -> None:
+        try:
+            dump_path.write_bytes(pngs[0])
+            if len(pngs) > 1:
+                dump_path.with_name(f"{dump_path.stem}_memory.png").write_bytes(pngs[1])
+        except Exception as e:
+            print(f"[dump error] {e}")
+
+    def __enter__(self) -> FrameGrabber:
+        self._io = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="franz-dump")
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        if self._io is not None:
+            self._io.shutdown(wait=True)  # flush the last step's dump files
+            self._io = None
+        for shot in (self._screen, self._memory):
+            if shot is not None:
+                shot.close()
+        self._screen = self._memory = None
+
+    def grab(self, dump_path: Path | None = None) -> list[bytes]:
+        """Capture a frame now (post-action): overview PNG, plus the memory close-up when visible."""
+        if self._screen is None:
+            self._screen = Screenshotter(dw=SCREEN_W, dh=SCREEN_H)
+            self._screen_buf = SharpenBuffers(dw=SCREEN_W, dh=SCREEN_H)
+        frame = self._screen.capture(0, 0, self.sw, self.sh)
+        pngs = [encode_png(sharpen(frame, self._screen_buf), SCREEN_W, SCREEN_H)]
+
+        rect = self.hud.memory_rect()
+        if rect is not None:
+            x, y, rw, rh = rect
+            cw, ch = max(1, int(rw * MEMORY_CROP_SCALE)), max(1, int(rh * MEMORY_CROP_SCALE))
+            if self._memory is None or (self._memory.dw, self._memory.dh) != (cw, ch):
+                if self._memory is not None:
+                    self._memory.close()
+                    self._memory = None
+                self._memory = Screenshotter(dw=cw, dh=ch)
+                self._memory_buf = SharpenBuffers(dw=cw, dh=ch)
+            frame = self._memory.capture(x, y, rw, rh)
+            pngs.append(encode_png(sharpen(frame, self._memory_buf), cw, ch))
+
+        if dump_path is not None and self._io is not None:
+            self._io.submit(self._write_dump, dump_path, pngs)
+        return pngs
 
 
 # ----------------------------- Tool execution -----------------------------
 
 
+def _xy(args: dict[str, Any], conv: Coord, kx: str = "x", ky: str = "y") -> tuple[int, int]:
+    return conv.to_screen(float(args[kx]), float(args[ky]))
+
+
+def _do_click(args: dict[str, Any], conv: Coord) -> None:
+    mouse_click(*_xy(args, conv), conv)
+
+
+def _do_right_click(args: dict[str, Any], conv: Coord) -> None:
+    mouse_right_click(*_xy(args, conv), conv)
+
+
+def _do_double_click(args: dict[str, Any], conv: Coord) -> None:
+    mouse_double_click(*_xy(args, conv), conv)
+
+
+def _do_drag(args: dict[str, Any], conv: Coord) -> None:
+    mouse_drag(*_xy(args, conv, "x1", "y1"), *_xy(args, conv, "x2", "y2"), conv)
+
+
+def _do_type(args: dict[str, Any], conv: Coord) -> None:
+    type_text(str(args["text"]))
+
+
+def _do_scroll(args: dict[str, Any], conv: Coord) -> None:
+    scroll(float(args["dy"]))
+
+
+_TOOL_DISPATCH = {
+    "click": _do_click,
+    "right_click": _do_right_click,
+    "double_click": _do_double_click,
+    "drag": _do_drag,
+    "type": _do_type,
+    "scroll": _do_scroll,
+}
+
+
 def execute_tool_action(tool: str, args: dict[str, Any], conv: Coord) -> None:
-    match tool:
-        case "click":
-            x, y = conv.to_screen(float(args["x"]), float(args["y"]))
-            mouse_click(x, y, conv)
-        case "right_click":
-            x, y = conv.to_screen(float(args["x"]), float(args["y"]))
-            mouse_right_click(x, y, conv)
-        case "double_click":
-            x, y = conv.to_screen(float(args["x"]), float(args["y"]))
-            mouse_double_click(x, y, conv)
-        case "drag":
-            x1, y1 = conv.to_screen(float(args["x1"]), float(args["y1"]))
-            x2, y2 = conv.to_screen(float(args["x2"]), float(args["y2"]))
-            mouse_drag(x1, y1, x2, y2, conv)
-        case "type":
-            type_text(str(args["text"]))
-        case "scroll":
-            scroll(float(args["dy"]))
+    handler = _TOOL_DISPATCH.get(tool)
+    if handler is not None:
+        handler(args, conv)
 
 
 # ----------------------------- Main -----------------------------
@@ -974,21 +1239,21 @@ def execute_tool_action(tool: str, args: dict[str, Any], conv: Coord) -> None:
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="FRANZ - Narrative-driven stateless Windows desktop agent")
+    parser.add_argument("--settle-ms", type=int, default=ACTION_SETTLE_MS, help="wait between an action and the next capture")
     args = parser.parse_args()
+    settle = max(0, args.settle_ms) / 1000.0
 
-    sw = user32.GetSystemMetrics(0)
-    sh = user32.GetSystemMetrics(1)
-    conv = Coord(sw=sw, sh=sh)
+    sw, sh, conv = SW, SH, DEFAULT_COORD
 
     dump_dir = DUMP_FOLDER / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     dump_dir.mkdir(parents=True, exist_ok=True)
 
-    print(f"FRANZ awakens | Physical: {sw}x{sh} | Perception: {SCREEN_W}x{SCREEN_H}")
+    print(f"FRANZ awakens | Physical: {sw}x{sh} | Perception: {SCREEN_W}x{SCREEN_H} + memory x{MEMORY_CROP_SCALE}")
     print(f"Quality: {SCREENSHOT_QUALITY} | Story-aware adaptive sampling")
     print(f"Dump: {dump_dir}")
     print("Starting PAUSED - Write task in HUD, then click RESUME\n")
 
-    with HUD() as hud:
+    with HUD() as hud, FrameGrabber(sw=sw, sh=sh, hud=hud) as capture:
         step = 0
         current_story = STORY_PREAMBLE
 
@@ -1001,32 +1266,24 @@ def main() -> None:
             if hud.stop_event.is_set():
                 break
 
-            time.sleep(0.02)
             step += 1
             ts = datetime.now().strftime("%H:%M:%S")
 
-            bgra = capture_screen(sw, sh)
-            down = downsample(bgra, sw, sh, SCREEN_W, SCREEN_H)
-            png = encode_png(down, SCREEN_W, SCREEN_H)
-            (dump_dir / f"step{step:03d}.png").write_bytes(png)
+            pngs = capture.grab(dump_dir / f"step{step:03d}.png")
 
             try:
-                tool, args2 = call_vlm(png, current_story)
+                tool, args2 = call_vlm(pngs, current_story)
                 new_chapter = args2.get("report", "")
 
                 print(f"\n[{ts}] {step:03d} | {tool}")
                 print(f"{new_chapter}\n")
 
                 current_story = f"{STORY_PREAMBLE}\n\n{new_chapter}"
-                hud.update(current_story)
-
-                time.sleep(0.1)
+                hud.update(current_story)  # SendMessageW: returns once the UI thread has the new text
 
                 if tool != "observe":
                     execute_tool_action(tool, args2, conv)
-                    time.sleep(0.5)
-                else:
-                    time.sleep(0.2)
+                time.sleep(settle)
 
             except Exception as e:
                 print(f"[{ts}] Error: {e}")